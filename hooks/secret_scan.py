@@ -1,111 +1,625 @@
 #!/usr/bin/env python3
 """
 Pre-commit hook: scan staged files for secrets using regex + YAML-configured patterns.
-Loads .githooks/patterns.yml (list of regex strings). If YAML fails or file missing,
-falls back to built-in patterns.
+Loads .githooks/patterns.json or .githooks/patterns.yml (list of regex strings). If
+parsing fails or neither file exists, falls back to built-in patterns.
+Matching engines, fastest available first:
+  1. `hyperscan` (optional): all patterns in one database, one pass per file.
+  2. `google-re2` (optional): an RE2::Set, one linear-time pass per file.
+  3. stdlib `re`: all patterns joined into one alternation (clean files only).
+  4. stdlib `re`: patterns scanned one by one.
+With 1 and 2 only the patterns that fire are re-run with `re` to locate the matches;
+patterns they can't represent exactly (see portable_source) always run through `re`.
 """
 
+import bisect
+import hashlib
+import json
+import os
 import re
 import sys
+import threading
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque, namedtuple
+from functools import lru_cache, partial
 from pathlib import Path
 
 try:
     import yaml
+    try:
+        from yaml import CSafeLoader as SafeLoader  # libyaml: much faster than pure Python
+    except ImportError:
+        from yaml import SafeLoader
 except Exception:
     yaml = None  # handle missing PyYAML gracefully
 
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+try:
+    import hyperscan
+except Exception:
+    hyperscan = None  # optional; not available on every platform (e.g. Windows)
+
+try:
+    import re2  # google-re2
+except Exception:
+    re2 = None  # optional
+
 # -------------------------
 # Built-in default patterns
 # -------------------------
 DEFAULT_PATTERNS = [
-    r'(?i)(password|passwd|pwd)\s*[:=]\s*["\']?\S{4,}["\']?',
-    r'(?i)(api[_-]?key|apikey|token|secret|access[_-]?key)\s*[:=]\s*["\']?\S{8,}["\']?',
+    r'(?i)(?:password|passwd|pwd)\s*[:=]\s*["\']?[^"\'\s]{4,256}["\']?',
+    r'(?i)(?:api[_-]?key|apikey|token|secret|access[_-]?key)\s*[:=]\s*["\']?[^"\'\s]{8,256}["\']?',
     r'AKIA[0-9A-Z]{16}',
     r'AIza[0-9A-Za-z\-_]{35}',
     r'xox[baprs]-[A-Za-z0-9-]{10,}',
-    r'-----BEGIN (RSA|PRIVATE|OPENSSH|DSA|EC) PRIVATE KEY-----',
+    r'-----BEGIN (?:RSA|PRIVATE|OPENSSH|DSA|EC) PRIVATE KEY-----',
     r'eyJ[a-zA-Z0-9_-]{10,}\.[a-zA-Z0-9._-]+\.[a-zA-Z0-9._-]+',
     # smart uuid detection
     r'(?i)(?:vault|secret|token|key|credential|clientid|client_id|secret_id)[A-Za-z0-9_\-]*\s*[:=]\s*["\']?[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}["\']?',
 ]
 
 PATTERNS_FILE = Path('.githooks') / 'patterns.yml'
-EXT_RE = re.compile(r'\.(py|java|js|ts|json|yaml|yml|env|properties|sh)$', re.I)
+PATTERNS_JSON_FILE = Path('.githooks') / 'patterns.json'  # preferred if present; no PyYAML needed
+SCAN_EXTENSIONS = ('py', 'java', 'js', 'ts', 'json', 'yaml', 'yml', 'env', 'properties', 'sh')
+# let git do the extension filtering instead of matching every staged name in Python
+SCAN_PATHSPECS = [f':(glob,icase)**/*.{ext}' for ext in SCAN_EXTENSIONS]
+DEFAULT_MAX_FILE_SIZE = 1024 * 1024
+
+def _max_file_size():
+    raw = os.environ.get('SECRET_SCAN_MAX_BYTES')
+    if raw is None:
+        return DEFAULT_MAX_FILE_SIZE
+    try:
+        value = int(raw)
+        if value <= 0:
+            raise ValueError
+        return value
+    except ValueError:
+        print(f"[WARN] Ignoring invalid SECRET_SCAN_MAX_BYTES={raw!r}; using {DEFAULT_MAX_FILE_SIZE}.")
+        return DEFAULT_MAX_FILE_SIZE
+
+# files bigger than this (bundles, lockfiles, dumps) are skipped with a warning
+MAX_FILE_SIZE = _max_file_size()
+BINARY_SNIFF_BYTES = 8192  # a NUL byte in this prefix marks the file as binary
+PREFILTER_CHUNK = 1024 * 1024  # literal prefilter lower-cases at most this much at a time
+MAX_IN_FLIGHT_BYTES = 8 * 1024 * 1024  # staged content read ahead of the scanners
+MAX_IN_FLIGHT_FILES = 256
 
 def load_patterns():
-    if not PATTERNS_FILE.exists():
+    for path in (PATTERNS_JSON_FILE, PATTERNS_FILE):
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            continue
+        return list(_load_patterns(str(path), mtime))
+    return DEFAULT_PATTERNS
+
+@lru_cache(maxsize=None)
+def _load_patterns(path, mtime):
+    # cached per (path, mtime): repeated loads in one process skip the YAML parse,
+    # and editing the file invalidates the entry
+    if path.endswith('.json'):
+        try:
+            cfg = json.loads(Path(path).read_bytes())
+        except Exception as e:
+            print(f"[WARN] Failed to parse patterns file {path}: {e}")
+            return DEFAULT_PATTERNS
+        if isinstance(cfg, list) and all(isinstance(x, str) for x in cfg):
+            return tuple(cfg)
+        print("[WARN] patterns.json format invalid (expect top-level list). Using defaults.")
         return DEFAULT_PATTERNS
     if yaml is None:
         print(f"[WARN] PyYAML not installed; ignoring patterns.yml and using defaults.")
         return DEFAULT_PATTERNS
     try:
-        with PATTERNS_FILE.open('r', encoding='utf-8') as f:
-            cfg = yaml.safe_load(f)
+        with open(path, 'r', encoding='utf-8') as f:
+            cfg = yaml.load(f, Loader=SafeLoader)
         if isinstance(cfg, list) and all(isinstance(x, str) for x in cfg):
-            return cfg
+            return tuple(cfg)
         else:
             print(f"[WARN] patterns.yml format invalid (expect top-level list). Using defaults.")
             return DEFAULT_PATTERNS
     except Exception as e:
-        print(f"[WARN] Failed to parse patterns file {PATTERNS_FILE}: {e}")
+        print(f"[WARN] Failed to parse patterns file {path}: {e}")
         return DEFAULT_PATTERNS
 
 def compile_patterns(patterns):
+    # identical entries (e.g. a pattern pasted twice into patterns.yml) would
+    # only double the scanning work and the report lines; keep the first
+    return list(_compile_patterns(tuple(dict.fromkeys(patterns))))
+
+@lru_cache(maxsize=None)
+def _compile_patterns(patterns):
     compiled = []
     for p in patterns:
         # If pattern already includes inline (?i) we'll still compile with MULTILINE,
         # and keep case-sensitivity as per pattern. Use IGNORECASE only if pattern isn't explicitly case-sensitive.
         try:
-            # compile with MULTILINE for per-line anchors; do not pass flags later
-            compiled.append(re.compile(p, flags=re.MULTILINE))
-        except re.error:
-            # fallback: compile without flags if compile fails
-            compiled.append(re.compile(p))
-    return compiled
+            # compile with MULTILINE for per-line anchors; do not pass flags later.
+            # Patterns are bytes so file content can be scanned without decoding it.
+            compiled.append(re.compile(p.encode(), flags=re.MULTILINE))
+        except re.error as e:
+            # skip a bad user regex instead of aborting the whole hook
+            print(f"[WARN] Skipping invalid pattern {p!r}: {e}")
+    return tuple(compiled)
 
-def get_staged_files():
-    res = subprocess.run(
-        ['git', 'diff', '--cached', '--name-only', '--diff-filter=ACM'],
-        capture_output=True, text=True
-    )
+LEADING_FLAGS_RE = re.compile(r'^\(\?([aiLmsux]+)\)')
+
+def _refers_to_groups(items):
+    """True if the parsed regex `items` contains a backreference or a group
+    conditional such as (?(1)...), which number groups by position."""
+    for op, av in items:
+        if op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            return True
+        for value in av if isinstance(av, (tuple, list)) else ():
+            subs = value if isinstance(value, list) else [value]
+            if any(isinstance(sub, sre_parse.SubPattern) and _refers_to_groups(sub) for sub in subs):
+                return True
+    return False
+
+def build_combined_regex(compiled_patterns):
+    """Join all patterns into one alternation of named groups (p0, p1, ...) so a
+    clean file is rejected with a single traversal. An alternation reports only
+    one pattern per matched span, so it is used as a yes/no gate: if it matches
+    anywhere, every pattern is run to collect the findings.
+    Returns None if there are no patterns or they cannot be safely combined."""
+    if not compiled_patterns:
+        return None  # b'' would match the empty string everywhere
+    parts = []
+    for i, pat in enumerate(compiled_patterns):
+        src = pat.pattern.decode()
+        if _refers_to_groups(sre_parse.parse(pat.pattern)):
+            return None  # group numbers shift once each pattern is wrapped in a group
+        # global inline flags like (?i) are only legal at the start; scope them to the group
+        m = LEADING_FLAGS_RE.match(src)
+        if m:
+            src = f'(?{m.group(1)}:{src[m.end():]})'
+        parts.append(f'(?P<p{i}>{src})')
+    try:
+        return re.compile('|'.join(parts).encode(), re.MULTILINE)
+    except re.error:
+        return None
+
+HS_FLAGS = (hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_SINGLEMATCH) if hyperscan else 0
+
+# A prefilter engine (Hyperscan, RE2) plus which patterns it covers: `ids` maps the
+# engine's pattern index to our pattern id; `ungated` patterns always run through re.
+Gate = namedtuple('Gate', 'engine ids ungated')
+
+_SPACE_CLASS = '\\x09-\\x0d\\x20'  # what \s matches in a bytes pattern (RE2's \s lacks \v)
+_CATEGORY_CLASSES = {
+    sre_parse.CATEGORY_DIGIT: '0-9',
+    sre_parse.CATEGORY_SPACE: _SPACE_CLASS,
+    sre_parse.CATEGORY_WORD: '0-9A-Za-z_',
+}
+_NOT_CATEGORY = {
+    sre_parse.CATEGORY_NOT_DIGIT: sre_parse.CATEGORY_DIGIT,
+    sre_parse.CATEGORY_NOT_SPACE: sre_parse.CATEGORY_SPACE,
+    sre_parse.CATEGORY_NOT_WORD: sre_parse.CATEGORY_WORD,
+}
+_ANCHORS = {
+    sre_parse.AT_BEGINNING: '^',
+    sre_parse.AT_END: '$',
+    sre_parse.AT_BEGINNING_STRING: '\\A',
+    sre_parse.AT_END_STRING: '\\z',
+    sre_parse.AT_BOUNDARY: '\\b',
+    sre_parse.AT_NON_BOUNDARY: '\\B',
+}
+
+class _Unportable(Exception):
+    pass
+
+def _byte(c):
+    return chr(c) if chr(c).isalnum() and c < 128 else f'\\x{c:02x}'
+
+def _emit(items, icase, dotall):
+    out = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            out.append(_byte(av))
+        elif op is sre_parse.NOT_LITERAL:
+            out.append(f'[^{_byte(av)}]')
+        elif op is sre_parse.ANY:
+            out.append('[\\x00-\\xff]' if dotall else '[^\\n]')
+        elif op is sre_parse.IN:
+            if len(av) == 1 and av[0][0] is sre_parse.CATEGORY and av[0][1] in _NOT_CATEGORY:
+                out.append(f'[^{_CATEGORY_CLASSES[_NOT_CATEGORY[av[0][1]]]}]')
+                continue
+            parts = []
+            for i, (kind, value) in enumerate(av):
+                if kind is sre_parse.NEGATE and i == 0:
+                    parts.append('^')
+                elif kind is sre_parse.LITERAL:
+                    parts.append(_byte(value))
+                elif kind is sre_parse.RANGE:
+                    parts.append(f'{_byte(value[0])}-{_byte(value[1])}')
+                elif kind is sre_parse.CATEGORY and value in _CATEGORY_CLASSES:
+                    parts.append(_CATEGORY_CLASSES[value])
+                else:
+                    raise _Unportable(kind)
+            out.append('[' + ''.join(parts) + ']')
+        elif op is sre_parse.AT and av in _ANCHORS:
+            out.append(_ANCHORS[av])
+        elif op is sre_parse.BRANCH:
+            out.append('(?:' + '|'.join(_emit(alt, icase, dotall) for alt in av[1]) + ')')
+        elif op is sre_parse.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            if (add_flags | del_flags) & ~(sre_parse.SRE_FLAG_IGNORECASE | sre_parse.SRE_FLAG_DOTALL
+                                           | sre_parse.SRE_FLAG_MULTILINE | sre_parse.SRE_FLAG_VERBOSE):
+                raise _Unportable(op)
+            if del_flags & sre_parse.SRE_FLAG_MULTILINE:
+                raise _Unportable(op)
+            sub_icase = bool((icase or add_flags & sre_parse.SRE_FLAG_IGNORECASE)
+                             and not del_flags & sre_parse.SRE_FLAG_IGNORECASE)
+            sub_dotall = bool((dotall or add_flags & sre_parse.SRE_FLAG_DOTALL)
+                              and not del_flags & sre_parse.SRE_FLAG_DOTALL)
+            prefix = '(?:' if sub_icase == icase else ('(?i:' if sub_icase else '(?-i:')
+            out.append(prefix + _emit(sub, sub_icase, sub_dotall) + ')')
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            lo, hi, sub = av
+            body = '(?:' + _emit(sub, icase, dotall) + ')'
+            if hi == sre_parse.MAXREPEAT:
+                count = {0: '*', 1: '+'}.get(lo, f'{{{lo},}}')
+            elif lo == 0 and hi == 1:
+                count = '?'
+            else:
+                count = f'{{{lo}}}' if lo == hi else f'{{{lo},{hi}}}'
+            out.append(body + count + ('?' if op is sre_parse.MIN_REPEAT else ''))
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            pass  # dropping a lookaround only widens what matches; fine for a prefilter
+        else:
+            raise _Unportable(op)
+    return ''.join(out)
+
+def portable_source(pattern):
+    """Re-emit a (bytes) `re` pattern in the plain syntax that Hyperscan and RE2
+    read the same way as Python: explicit byte classes for \\s/\\d/\\w, {0,n} for
+    {,n}, \\xHH escapes, scoped (?i:...) groups. The result matches at least
+    everything the original does (lookarounds are dropped), so it is safe as a
+    prefilter. Returns None for constructs that can't be expressed (backreferences,
+    conditionals, atomic groups, locale flags)."""
+    try:
+        parsed = sre_parse.parse(pattern)
+        flags = parsed.state.flags if hasattr(parsed, 'state') else parsed.pattern.flags
+        if flags & (sre_parse.SRE_FLAG_LOCALE | sre_parse.SRE_FLAG_UNICODE):
+            return None
+        icase = bool(flags & sre_parse.SRE_FLAG_IGNORECASE)
+        source = _emit(parsed, icase, bool(flags & sre_parse.SRE_FLAG_DOTALL))
+    except Exception:
+        return None
+    return (('(?i)' if icase else '') + source).encode()
+
+def get_cache_dir():
+    """Per-repository cache directory inside the git dir (never in the working tree)."""
+    res = subprocess.run(['git', 'rev-parse', '--git-path', 'secret-scan'], capture_output=True)
     if res.returncode != 0:
-        return []
-    return [p.strip() for p in res.stdout.splitlines() if p.strip()]
+        return None
+    return Path(os.fsdecode(res.stdout.strip()))
 
-def scan_file(path, compiled_patterns):
+def _compile_hyperscan(sources):
+    db = hyperscan.Database()
+    db.compile(
+        expressions=list(sources),
+        ids=list(range(len(sources))),
+        elements=len(sources),
+        # no SOM_LEFTMOST: start-of-match tracking makes bounded repeats like
+        # {4,256} "too large"; match positions come from `re` on the (rare) hits
+        flags=[HS_FLAGS] * len(sources),
+    )
+    return db
+
+def build_hyperscan_gate(patterns, cache_dir=None):
+    """Compile the (bytes) patterns Hyperscan can take into one database and return a
+    Gate, or None if unavailable. Patterns it can't represent exactly are left to re.
+    With `cache_dir`, the serialized database is stored there keyed by a hash of the
+    patterns, and later runs load it instead of recompiling."""
+    if hyperscan is None or not patterns:
+        return None
+    sources = {i: portable_source(p) for i, p in enumerate(patterns)}
+    ids = [i for i, src in sources.items() if src is not None]
+    cache_file = None
+    if cache_dir is not None:
+        # unportable patterns hash as b'' so the key pins down which ids are gated
+        key = hashlib.sha256(b'\x00'.join([str(HS_FLAGS).encode()]
+                                          + [src or b'' for src in sources.values()]))
+        cache_file = cache_dir / f'patterns-{key.hexdigest()[:16]}.hsdb'
+        try:
+            header, _, blob = cache_file.read_bytes().partition(b'\n')
+            cached_ids = [int(i) for i in header.split(b',') if i]
+            db = hyperscan.loadb(blob, hyperscan.HS_MODE_BLOCK)
+            return Gate(db, cached_ids, [i for i in range(len(patterns)) if i not in cached_ids])
+        except Exception:
+            pass  # missing, or built by another Hyperscan version/platform: recompile
     try:
-        text = Path(path).read_text(errors='ignore')
+        db = _compile_hyperscan([sources[i] for i in ids])
     except Exception:
-        return []
-    findings = []
+        # isolate the expressions Hyperscan rejects (e.g. ones matching the empty string)
+        ids = [i for i in ids if _compiles_alone(sources[i])]
+        try:
+            db = _compile_hyperscan([sources[i] for i in ids]) if ids else None
+        except Exception:
+            db = None
+    if db is None:
+        return None
+    if cache_file is not None:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            for stale in cache_dir.glob('patterns-*.hsdb'):
+                stale.unlink()
+            tmp = cache_file.with_suffix(f'.tmp{os.getpid()}')
+            # "<gated pattern ids>\n<serialized database>"
+            tmp.write_bytes(','.join(map(str, ids)).encode() + b'\n' + hyperscan.dumpb(db))
+            os.replace(tmp, cache_file)  # atomic: concurrent hooks never see a partial file
+        except OSError:
+            pass  # caching is best effort
+    return Gate(db, ids, [i for i in range(len(patterns)) if i not in ids])
+
+def _compiles_alone(source):
+    try:
+        _compile_hyperscan([source])
+        return True
+    except Exception:
+        return False
+
+def _literal_factors(items):
+    """Return a set of lowercase literals, one of which every match of the parsed
+    regex `items` must contain, or None if no such set can be derived."""
+    best, run = None, ''
+    for op, av in list(items) + [(None, None)]:
+        if op is sre_parse.LITERAL and av < 128:
+            run += chr(av).lower()
+            continue
+        candidates = []
+        if run:
+            candidates.append({run})
+            run = ''
+        if op is sre_parse.SUBPATTERN:
+            candidates.append(_literal_factors(av[-1]))
+        elif op is sre_parse.BRANCH:
+            alternatives = [_literal_factors(alt) for alt in av[1]]
+            if all(alternatives):
+                candidates.append(set().union(*alternatives))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            candidates.append(_literal_factors(av[2]))
+        for cand in candidates:
+            # prefer the set whose shortest literal is longest (fewest false candidates)
+            if cand and (best is None or min(map(len, cand)) > min(map(len, best))):
+                best = cand
+    return best
+
+def required_literals(compiled_patterns):
+    """Literals (lowercase bytes) at least one of which must occur in any content
+    that some pattern can match, e.g. b'akia', b'-----begin '. Content without any
+    of them can be rejected with plain substring searches before running a regex.
+    Returns None (no prefilter) if any pattern has no required literal."""
+    literals = set()
     for pat in compiled_patterns:
-        # Use pat.finditer (compiled pattern) — do NOT pass flags here
-        for m in pat.finditer(text):
-            line_no = text.count('\n', 0, m.start()) + 1
-            lines = text.splitlines()
-            snippet = lines[line_no - 1].strip() if 0 <= line_no - 1 < len(lines) else ''
-            findings.append((line_no, snippet, pat.pattern))
+        try:
+            factors = _literal_factors(sre_parse.parse(pat.pattern))
+        except Exception:
+            factors = None
+        if not factors:
+            return None
+        literals.update(f.encode() for f in factors)
+    return sorted(literals) if literals else None
+
+def build_re2_gate(patterns):
+    """Compile the (bytes) patterns RE2 can take into one RE2::Set and return a Gate,
+    or None if unavailable. Patterns it can't represent exactly are left to re."""
+    if re2 is None or not patterns:
+        return None
+    try:
+        options = re2.Options()
+        options.encoding = re2.Options.Encoding.LATIN1  # byte semantics, like re on bytes
+        options.never_capture = True
+        options.log_errors = False
+        pattern_set = re2.Set.SearchSet(options)
+        ids = []
+        for i, p in enumerate(patterns):
+            source = portable_source(p)
+            if source is None:
+                continue
+            try:
+                pattern_set.Add(b'(?m)' + source)  # same per-line anchors as re.MULTILINE
+            except re2.error:
+                continue  # e.g. a repeat count over RE2's limit of 1000
+            ids.append(i)
+        if not ids:
+            return None
+        pattern_set.Compile()
+    except Exception:
+        # not google-re2 (e.g. pyre2 / fb-re2 also install as `re2`), or compile failure
+        return None
+    return Gate(pattern_set, ids, [i for i in range(len(patterns)) if i not in ids])
+
+def iter_nul_fields(stream, chunk_size=65536):
+    """Yield NUL-terminated fields from a binary stream as they arrive."""
+    buf = b''
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        buf += chunk
+        *fields, buf = buf.split(b'\x00')
+        yield from fields
+
+def get_staged_files():
+    """Yield (path, blob_sha) for every added/copied/modified staged file with a
+    scanned extension.
+    Uses NUL-delimited output so unusual filenames (newlines, quotes) survive;
+    paths stay as bytes. The git output is streamed, so callers can start on
+    the first files while git is still listing the rest."""
+    proc = subprocess.Popen(
+        ['git', 'diff', '--cached', '--raw', '-z', '--no-abbrev', '--diff-filter=ACM', '--']
+        + SCAN_PATHSPECS,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        # records: ":<old mode> <new mode> <old sha> <new sha> <status>\0<path>\0"
+        # (copies carry "<src>\0<dst>\0")
+        fields = iter_nul_fields(proc.stdout)
+        for meta in fields:
+            meta = meta.split()
+            path = next(fields)
+            if meta[4][:1] in (b'C', b'R'):
+                path = next(fields)
+            if meta[1] == b'160000':  # skip submodule gitlinks
+                continue
+            yield path, meta[3]
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+def read_staged_blobs(staged):
+    """Read the staged (index) content of each file through one `git cat-file --batch`
+    process, so what gets scanned is what gets committed, not the working tree.
+    Yields (path, bytes) as each blob is read, so scanning can start before the
+    listing is done."""
+    proc = None
+    try:
+        for path, sha in staged:
+            if proc is None:  # started on the first file, so nothing staged costs nothing
+                proc = subprocess.Popen(['git', 'cat-file', '--batch'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            # one request at a time: writing everything up front can deadlock on full pipes
+            proc.stdin.write(sha + b'\n')
+            proc.stdin.flush()
+            header = proc.stdout.readline().split()
+            if len(header) != 3:  # "<sha> missing"
+                continue
+            size = int(header[2])
+            if size > MAX_FILE_SIZE:
+                print(f"[WARN] Skipping {path.decode(errors='replace')}: {size} bytes exceeds "
+                      f"{MAX_FILE_SIZE} (set SECRET_SCAN_MAX_BYTES to raise the limit).")
+                while size > 0:  # drain without keeping it in memory
+                    chunk = proc.stdout.read(min(size, 65536))
+                    if not chunk:
+                        raise RuntimeError(f"git cat-file exited while reading {path.decode(errors='replace')}")
+                    size -= len(chunk)
+                proc.stdout.read(1)
+                continue
+            data = proc.stdout.read(size)
+            if len(data) != size:  # never scan a truncated blob as if it were the whole file
+                raise RuntimeError(f"git cat-file exited while reading {path.decode(errors='replace')}")
+            proc.stdout.read(1)  # trailing LF after the content
+            if header[1] == b'blob':
+                yield path, data
+    finally:
+        if proc is not None:
+            proc.stdin.close()
+            proc.stdout.close()
+            proc.wait()
+
+_hs_local = threading.local()
+
+def hyperscan_matched_ids(data, hs_db):
+    """Scan bytes once with the Hyperscan DB; return the DB indexes of expressions that matched."""
+    # scratch space can't be shared between concurrent scans; keep one per thread
+    scratch = getattr(_hs_local, 'scratch', None)
+    if scratch is None or scratch.database is not hs_db:
+        scratch = _hs_local.scratch = hyperscan.Scratch(hs_db)
+    matched = set()
+    hs_db.scan(data, match_event_handler=lambda id, frm, to, flags, ctx: ctx.add(id),
+               context=matched, scratch=scratch)
+    return matched
+
+def hits_to_findings(data, hits, compiled_patterns):
+    """Turn (pattern_id, offset) hits into (line_no, snippet, pattern) findings.
+    Newline offsets are computed once per file and binary-searched per hit; the
+    snippet is sliced between neighbouring newlines (no per-file line list) and
+    only it is decoded."""
+    newlines = [m.start() for m in re.finditer(b'\n', data)]
+    findings = []
+    for pid, start in hits:
+        i = bisect.bisect_left(newlines, start)
+        line_start = newlines[i - 1] + 1 if i > 0 else 0
+        line_end = newlines[i] if i < len(newlines) else len(data)
+        snippet = data[line_start:line_end].strip()
+        findings.append((i + 1, snippet.decode('utf-8', 'replace'),
+                         compiled_patterns[pid].pattern.decode()))
     return findings
 
+def contains_any_literal(data, literals):
+    """Case-insensitive check for any of `literals` in `data`.
+    Lower-cases one chunk at a time so a large file is never copied whole."""
+    overlap = max(map(len, literals)) - 1
+    for pos in range(0, len(data), PREFILTER_CHUNK):
+        chunk = data[max(0, pos - overlap):pos + PREFILTER_CHUNK].lower()
+        if any(lit in chunk for lit in literals):
+            return True
+    return False
+
+def scan_data(data, compiled_patterns, hs_gate=None, combined=None, literals=None, re2_gate=None):
+    """Scan file content (bytes) and return [(line_no, snippet, pattern), ...]."""
+    if b'\x00' in data[:BINARY_SNIFF_BYTES]:
+        return []  # binary
+    if literals is not None and not contains_any_literal(data, literals):
+        return []  # no pattern can match: the common, clean-file case
+    if hs_gate is not None or re2_gate is not None:
+        # one Hyperscan/RE2 pass decides which patterns fire; only those run through re
+        if hs_gate is not None:
+            gate, matched = hs_gate, hyperscan_matched_ids(data, hs_gate.engine)
+        else:
+            gate, matched = re2_gate, re2_gate.engine.Match(data) or ()
+        fired = {gate.ids[n] for n in matched}
+        fired.update(gate.ungated)
+        hits = [(i, m.start()) for i in sorted(fired) for m in compiled_patterns[i].finditer(data)]
+    else:
+        if combined is not None and combined.search(data) is None:
+            return []  # no pattern matches anywhere
+        # Use pat.finditer (compiled pattern) — do NOT pass flags here
+        hits = [(i, m.start()) for i, pat in enumerate(compiled_patterns) for m in pat.finditer(data)]
+    return hits_to_findings(data, hits, compiled_patterns)
+
 def main():
     patterns = load_patterns()
     compiled = compile_patterns(patterns)
+    if not compiled:
+        print("[WARN] No valid patterns configured; nothing to scan.")
+        print("[OK] No secrets detected. Commit allowed.")
+        sys.exit(0)
+    hs_gate = build_hyperscan_gate([p.pattern for p in compiled],
+                                   get_cache_dir() if hyperscan is not None else None)
+    re2_gate = None if hs_gate is not None else build_re2_gate([p.pattern for p in compiled])
+    combined = None if hs_gate is not None or re2_gate is not None else build_combined_regex(compiled)
+    literals = required_literals(compiled)
 
     staged = get_staged_files()
     secrets_found = {}
 
-    for f in staged:
-        if not EXT_RE.search(f):
-            continue
-        matches = scan_file(f, compiled)
+    scan = partial(scan_data, compiled_patterns=compiled, hs_gate=hs_gate, combined=combined,
+                   literals=literals, re2_gate=re2_gate)
+
+    def collect(f, future):
+        matches = future.result()
         if matches:
             secrets_found[f] = matches
 
+    # threads, not processes: after the literal prefilter most files take microseconds,
+    # so spawning workers (the default on Windows/macOS) costs more than it saves,
+    # and Hyperscan/RE2 release the GIL while matching
+    with ThreadPoolExecutor() as ex:
+        # listing, reading and scanning overlap; the oldest result is collected once
+        # too much is in flight, which bounds memory and keeps the report in git's order
+        pending = deque()
+        in_flight = 0
+        for f, data in read_staged_blobs(staged):
+            pending.append((f, len(data), ex.submit(scan, data)))
+            in_flight += len(data)
+            while in_flight > MAX_IN_FLIGHT_BYTES or len(pending) > MAX_IN_FLIGHT_FILES:
+                f, size, future = pending.popleft()
+                in_flight -= size
+                collect(f, future)
+        for f, _, future in pending:
+            collect(f, future)
+
     if secrets_found:
         print("\n[ALERT] Potential secrets detected:")
         for f, findings in secrets_found.items():
-            print(f"\nFile: {f}")
+            print(f"\nFile: {f.decode(errors='replace')}")
             for line, snippet, pat in findings:
                 print(f"  Line {line}: {snippet[:200]}")
         print("\n[BLOCKED] Commit blocked! Remove or mask secrets before committing.")
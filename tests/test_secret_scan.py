@@ -0,0 +1,118 @@
+import io
+import re
+
+import pytest
+
+from hooks import secret_scan
+
+# Fake secrets are split so this file doesn't trip the scanner it tests.
+AKIA = b'AKIA' + b'ABCDEFGHIJKLMNOP'
+UUID = b'12345678-1234-' + b'1234-1234-123456789abc'
+
+CORPUS = [
+    b'password = "' + b'hunter22"\n',
+    b"PWD: '" + b"correct-horse'\nother = 1\n",
+    b'config:\n  api_key: ' + b'abcdefgh12345678\n  apikey=' + b'"zzzzzzzzzz"\n',
+    b'aws = "' + AKIA + b'"\n',
+    b'password=' + AKIA + b'\n',  # overlapping findings from two patterns
+    b'token: ' + UUID + b'\n',
+    b'vault_id = "' + UUID + b'"\n',
+    b'AIza' + b'Sy0123456789abcdefghijklmnopqrstuvw\n',
+    b'slack = "xoxb-' + b'1234567890-abcdef"\n',
+    b'-----BEGIN RSA ' + b'PRIVATE KEY-----\nMIIE...\n',
+    b'jwt = eyJ' + b'hbGciOiJIUzI1NiJ9.eyJzdWIiOiIxIn0.sig_nature\n',
+    b'pwd\x0b=' + b'sesame99\n',  # \v is whitespace to re, but not to RE2's \s
+    b'nothing to see here\n' * 50,
+    b'',
+]
+
+# patterns that read differently in Hyperscan/RE2 syntax if passed through verbatim
+EXTRA_PATTERNS = [
+    r'pwd\s=',
+    r'secret_{,3}x',
+    r'(a)?(?(1)b|c)',  # group conditional: numbering shifts in the combined regex
+]
+EXTRA_CORPUS = [
+    b'pwd\x0b=\n',
+    b'secret__x\nsecret____x\n',
+    b'ab\n',
+]
+
+def old_patterns():
+    """DEFAULT_PATTERNS as they were before the groups were made non-capturing."""
+    return [p.replace('(?:', '(') for p in secret_scan.DEFAULT_PATTERNS]
+
+def spans(patterns, data):
+    return [[m.span() for m in re.compile(p.encode(), re.MULTILINE).finditer(data)]
+            for p in patterns]
+
+@pytest.mark.parametrize('data', CORPUS)
+def test_non_capturing_patterns_keep_spans(data):
+    assert spans(secret_scan.DEFAULT_PATTERNS, data) == spans(old_patterns(), data)
+
+def scan_with(engine, patterns, data):
+    compiled = secret_scan.compile_patterns(patterns)
+    sources = [p.pattern for p in compiled]
+    kwargs = {}
+    if engine == 'combined':
+        kwargs['combined'] = secret_scan.build_combined_regex(compiled)  # None: loop, as in main()
+    elif engine == 'hyperscan':
+        if secret_scan.hyperscan is None:
+            pytest.skip('hyperscan not installed')
+        kwargs['hs_gate'] = secret_scan.build_hyperscan_gate(sources)
+        assert kwargs['hs_gate'] is not None
+    elif engine == 're2':
+        if secret_scan.re2 is None:
+            pytest.skip('google-re2 not installed')
+        kwargs['re2_gate'] = secret_scan.build_re2_gate(sources)
+        assert kwargs['re2_gate'] is not None
+    elif engine == 'literals':
+        kwargs['literals'] = secret_scan.required_literals(compiled)
+    return secret_scan.scan_data(data, compiled, **kwargs)
+
+@pytest.mark.parametrize('engine', ['combined', 'hyperscan', 're2', 'literals'])
+def test_engines_agree(engine):
+    for patterns in (secret_scan.DEFAULT_PATTERNS, secret_scan.DEFAULT_PATTERNS + EXTRA_PATTERNS):
+        for data in CORPUS + EXTRA_CORPUS:
+            assert scan_with(engine, patterns, data) == scan_with('loop', patterns, data), data
+
+def test_combined_regex_declines_group_references():
+    compiled = secret_scan.compile_patterns(secret_scan.DEFAULT_PATTERNS)
+    assert secret_scan.build_combined_regex(compiled) is not None
+    for pattern in (r'(a)?(?(1)b|c)', r'(a)\1', r'(?P<n>a)(?P=n)', r'x(?=(a)\1)'):
+        compiled = secret_scan.compile_patterns(['x', pattern])
+        assert secret_scan.build_combined_regex(compiled) is None, pattern
+
+def test_findings_on_corpus():
+    patterns = secret_scan.DEFAULT_PATTERNS + EXTRA_PATTERNS
+    findings = scan_with('loop', patterns, CORPUS[4] + EXTRA_CORPUS[0] + EXTRA_CORPUS[1])
+    found = [(line, pat) for line, _, pat in findings]
+    assert (1, patterns[0]) in found and (1, patterns[2]) in found  # both overlapping hits
+    assert (2, r'pwd\s=') in found
+    assert [line for line, pat in found if pat == r'secret_{,3}x'] == [3]
+
+def test_binary_content_is_skipped():
+    compiled = secret_scan.compile_patterns(secret_scan.DEFAULT_PATTERNS)
+    assert secret_scan.scan_data(b'\x00' + CORPUS[3], compiled) == []
+
+def test_no_patterns():
+    assert secret_scan.compile_patterns([]) == []
+    assert secret_scan.build_combined_regex([]) is None
+    assert secret_scan.build_hyperscan_gate([]) is None
+    assert secret_scan.build_re2_gate([]) is None
+
+class TruncatedCatFile:
+    """Stands in for a `git cat-file --batch` that exits partway through a blob."""
+    def __init__(self, *args, **kwargs):
+        self.stdin = io.BytesIO()
+        self.stdout = io.BytesIO(b'0' * 40 + b' blob 10\nabc')
+
+    def wait(self):
+        return 128
+
+@pytest.mark.parametrize('max_size', [5, 100])  # draining an oversize blob / reading it
+def test_truncated_blob_is_an_error(monkeypatch, max_size):
+    monkeypatch.setattr(secret_scan.subprocess, 'Popen', TruncatedCatFile)
+    monkeypatch.setattr(secret_scan, 'MAX_FILE_SIZE', max_size)
+    with pytest.raises(RuntimeError):
+        list(secret_scan.read_staged_blobs([(b'a.py', b'0' * 40)]))